@@ -0,0 +1,178 @@
+"""多数のサーバーを模した合成DBで、サーバー単位のクエリコストがDB全体のサイズに依存しないことを確かめる
+
+使い方: python benchmark_guilds.py [--guilds 100 300 600] [--mutate 1000] [--output bench.db]
+
+--mutate N を付けると、最後に生成したDBに対して削除・タイムゾーン変更・過去日付の記録を
+それぞれN回行い、そのたびにcheck_streaks.pyで連続記録の整合性を検証する
+"""
+import os
+import time
+import random
+import shutil
+import argparse
+import datetime
+import tempfile
+from database import get_db_connection, initialize_database
+from streaks import record_solve, recompute_streak, update_streak_after_delete
+from check_streaks import check_streaks
+
+PLATFORMS = ["atcoder", "paiza"]
+# 日付の区切りが異なるユーザーを混ぜる（check_streaks.pyでの検証用）
+TIMEZONES = ["Asia/Tokyo", "UTC", "America/New_York", "Asia/Kolkata"]
+
+# cogs/summary.pyと同じクエリ
+RECENT_SOLVES_QUERY = "SELECT platform, problem_id, url, solved_at FROM solved_problems WHERE guild_id = ? AND user_id = ? ORDER BY solved_at DESC LIMIT 10"
+SOLVE_COUNTS_QUERY = "SELECT platform, COUNT(*) as count FROM solved_problems WHERE guild_id = ? AND user_id = ? GROUP BY platform"
+# サーバー内ランキング
+RANKING_QUERY = "SELECT user_id, COUNT(*) as count FROM solved_problems WHERE guild_id = ? GROUP BY user_id ORDER BY count DESC LIMIT 10"
+
+def generate_database(database_file: str, guilds: int, users_per_guild: int, solves_per_user: int, seed: int = 0):
+    """合成データを作成する。guild_idは1から、user_idはサーバーをまたいで一部重複させる
+
+    連続記録は/logと同じく1件ずつ時系列順にrecord_solveで更新する
+    """
+    rng = random.Random(seed)
+    initialize_database(database_file)
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    conn = get_db_connection(database_file)
+    try:
+        cursor = conn.cursor()
+        for guild_id in range(1, guilds + 1):
+            user_ids = rng.sample(range(1, users_per_guild * 10), users_per_guild)
+            cursor.executemany(
+                "INSERT INTO users (guild_id, user_id, reminder_time, reminder_tz) VALUES (?, ?, ?, ?)",
+                [(guild_id, user_id, "21:00", rng.choice(TIMEZONES)) for user_id in user_ids]
+            )
+            for user_id in user_ids:
+                solve_times = sorted(now - datetime.timedelta(seconds=rng.randrange(180 * 24 * 60 * 60)) for _ in range(solves_per_user))
+                for n, solved_at in enumerate(solve_times):
+                    cursor.execute(
+                        "INSERT INTO solved_problems (guild_id, user_id, platform, problem_id, url, solved_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (guild_id, user_id, rng.choice(PLATFORMS), f"p{n}", None, solved_at)
+                    )
+                    record_solve(cursor, guild_id, user_id, solved_at)
+        conn.commit()
+    finally:
+        conn.close()
+
+def delete_random_solves(database_file: str, count: int, seed: int = 0):
+    """/deleteと同じく、削除した解答の日時を渡して必要なときだけ連続記録を作り直す"""
+    rng = random.Random(seed)
+    conn = get_db_connection(database_file)
+    try:
+        cursor = conn.cursor()
+        solves = cursor.execute("SELECT id, guild_id, user_id, solved_at FROM solved_problems").fetchall()
+        for row in rng.sample(solves, min(count, len(solves))):
+            cursor.execute("DELETE FROM solved_problems WHERE id = ?", (row['id'],))
+            update_streak_after_delete(cursor, row['guild_id'], row['user_id'], [row['solved_at']])
+        conn.commit()
+    finally:
+        conn.close()
+
+def change_random_timezones(database_file: str, count: int, seed: int = 0):
+    """/set_reminderと同じく、タイムゾーンが変わったら連続記録を作り直す"""
+    rng = random.Random(seed)
+    conn = get_db_connection(database_file)
+    try:
+        cursor = conn.cursor()
+        users = cursor.execute("SELECT guild_id, user_id, reminder_tz FROM users").fetchall()
+        for row in rng.sample(users, min(count, len(users))):
+            timezone = rng.choice([tz for tz in TIMEZONES if tz != row['reminder_tz']])
+            cursor.execute("UPDATE users SET reminder_tz = ? WHERE guild_id = ? AND user_id = ?", (timezone, row['guild_id'], row['user_id']))
+            recompute_streak(cursor, row['guild_id'], row['user_id'])
+        conn.commit()
+    finally:
+        conn.close()
+
+def record_backdated_solves(database_file: str, count: int, seed: int = 0):
+    """最終解答日より前の日時で記録し、record_solveの作り直しを通す"""
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    conn = get_db_connection(database_file)
+    try:
+        cursor = conn.cursor()
+        users = cursor.execute("SELECT guild_id, user_id FROM users").fetchall()
+        for n in range(count):
+            row = rng.choice(users)
+            solved_at = now - datetime.timedelta(seconds=rng.randrange(180 * 24 * 60 * 60))
+            cursor.execute(
+                "INSERT INTO solved_problems (guild_id, user_id, platform, problem_id, url, solved_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (row['guild_id'], row['user_id'], rng.choice(PLATFORMS), f"late{n}", None, solved_at)
+            )
+            record_solve(cursor, row['guild_id'], row['user_id'], solved_at)
+        conn.commit()
+    finally:
+        conn.close()
+
+def time_queries(database_file: str, queries: int, seed: int = 0) -> dict[str, float]:
+    """各クエリの平均実行時間（マイクロ秒）を返す"""
+    rng = random.Random(seed)
+    conn = get_db_connection(database_file)
+    try:
+        targets = conn.execute("SELECT guild_id, user_id FROM users").fetchall()
+        samples = [rng.choice(targets) for _ in range(queries)]
+        results = {}
+        for name, query, use_user in (
+            ("recent", RECENT_SOLVES_QUERY, True),
+            ("counts", SOLVE_COUNTS_QUERY, True),
+            ("ranking", RANKING_QUERY, False),
+        ):
+            start = time.perf_counter()
+            for row in samples:
+                params = (row['guild_id'], row['user_id']) if use_user else (row['guild_id'],)
+                conn.execute(query, params).fetchall()
+            results[name] = (time.perf_counter() - start) / queries * 1e6
+        return results
+    finally:
+        conn.close()
+
+def print_query_plans(database_file: str):
+    conn = get_db_connection(database_file)
+    try:
+        for name, query, params in (
+            ("recent", RECENT_SOLVES_QUERY, (1, 1)),
+            ("counts", SOLVE_COUNTS_QUERY, (1, 1)),
+            ("ranking", RANKING_QUERY, (1,)),
+        ):
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            print(f"{name}: " + " / ".join(row['detail'] for row in plan))
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, nargs="+", default=[100, 300, 600])
+    parser.add_argument("--users-per-guild", type=int, default=20)
+    parser.add_argument("--solves-per-user", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--mutate", type=int, default=0, metavar="N", help="最後に生成したDBで連続記録の作り直しをN回ずつ行い検証する")
+    parser.add_argument("--output", help="最後に生成したDBをこのパスに残す")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_file = None
+        print(f"{'guilds':>8} {'rows':>10} {'recent(us)':>12} {'counts(us)':>12} {'ranking(us)':>12}")
+        for guilds in args.guilds:
+            database_file = os.path.join(tmp_dir, f"bench_{guilds}.db")
+            generate_database(database_file, guilds, args.users_per_guild, args.solves_per_user)
+            results = time_queries(database_file, args.queries)
+            rows = guilds * args.users_per_guild * args.solves_per_user
+            print(f"{guilds:>8} {rows:>10} {results['recent']:>12.1f} {results['counts']:>12.1f} {results['ranking']:>12.1f}")
+
+        print("-" * 30)
+        print_query_plans(database_file)
+        if args.mutate:
+            print("-" * 30)
+            # 経路ごとに検証する（後の経路の作り直しで前の経路の誤りが隠れないように）
+            for mutate in (delete_random_solves, change_random_timezones, record_backdated_solves):
+                mutate(database_file, args.mutate)
+                print(f"{mutate.__name__}: ", end="")
+                if check_streaks(database_file):
+                    raise SystemExit("Streak state does not match a full recompute.")
+        if args.output:
+            shutil.move(database_file, args.output)
+            print(f"Saved benchmark database to {args.output}")
+
+if __name__ == '__main__':
+    main()
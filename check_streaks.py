@@ -0,0 +1,32 @@
+"""保存されている連続記録が全履歴からの再計算結果と一致するか検証する
+
+使い方: python check_streaks.py [DBファイル]   （例: benchmark_guilds.py --output bench.db で作ったDB）
+"""
+import sys
+from database import DATABASE_FILE, get_db_connection
+from streaks import compute_streak_state
+
+def check_streaks(database_file: str) -> list[tuple]:
+    """一致しないユーザーの (guild_id, user_id, 保存値, 再計算値) を返す"""
+    conn = get_db_connection(database_file)
+    try:
+        cursor = conn.cursor()
+        mismatches = []
+        users = cursor.execute(
+            "SELECT guild_id, user_id, reminder_tz, current_streak, longest_streak, last_solve_day FROM users"
+        ).fetchall()
+        for row in users:
+            stored = (row['current_streak'], row['longest_streak'], row['last_solve_day'])
+            expected = compute_streak_state(cursor, row['guild_id'], row['user_id'], row['reminder_tz'])
+            if stored != expected:
+                mismatches.append((row['guild_id'], row['user_id'], stored, expected))
+        print(f"Checked {len(users)} users, {len(mismatches)} mismatches.")
+        return mismatches
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    mismatches = check_streaks(sys.argv[1] if len(sys.argv) > 1 else DATABASE_FILE)
+    for guild_id, user_id, stored, expected in mismatches:
+        print(f"- guild {guild_id} user {user_id}: stored={stored} expected={expected}")
+    sys.exit(1 if mismatches else 0)
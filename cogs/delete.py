@@ -3,10 +3,12 @@ from discord import app_commands, ui
 from discord.ext import commands
 import datetime
 from database import get_db_connection
+from streaks import update_streak_after_delete
 
 class ProblemSelect(discord.ui.Select):
     """削除する問題を選択するためのドロップダウンメニュー"""
-    def __init__(self, user_id: int, platform_value: str, problems: list):
+    def __init__(self, guild_id: int, user_id: int, platform_value: str, problems: list):
+        self.guild_id = guild_id
         self.user_id = user_id
         self.platform_value = platform_value
         
@@ -36,11 +38,19 @@ class ProblemSelect(discord.ui.Select):
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
+            deleted_solved_ats = []
             for problem_id in problems_to_delete:
+                row = cursor.execute(
+                    "SELECT solved_at FROM solved_problems WHERE guild_id = ? AND user_id = ? AND platform = ? AND problem_id = ?",
+                    (self.guild_id, self.user_id, self.platform_value, problem_id)
+                ).fetchone()
+                if row:
+                    deleted_solved_ats.append(row['solved_at'])
                 cursor.execute(
-                    "DELETE FROM solved_problems WHERE user_id = ? AND platform = ? AND problem_id = ?",
-                    (self.user_id, self.platform_value, problem_id)
+                    "DELETE FROM solved_problems WHERE guild_id = ? AND user_id = ? AND platform = ? AND problem_id = ?",
+                    (self.guild_id, self.user_id, self.platform_value, problem_id)
                 )
+            update_streak_after_delete(cursor, self.guild_id, self.user_id, deleted_solved_ats)
             conn.commit()
             
             deleted_list_str = "\n".join(f"• {pid}" for pid in problems_to_delete)
@@ -57,9 +67,9 @@ class ProblemSelect(discord.ui.Select):
 
 class DeleteView(discord.ui.View):
     """ProblemSelectを含むView"""
-    def __init__(self, user_id: int, platform_value: str, problems: list):
+    def __init__(self, guild_id: int, user_id: int, platform_value: str, problems: list):
         super().__init__(timeout=180.0)
-        self.add_item(ProblemSelect(user_id, platform_value, problems))
+        self.add_item(ProblemSelect(guild_id, user_id, platform_value, problems))
 
 class Delete(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -70,14 +80,16 @@ class Delete(commands.Cog):
         app_commands.Choice(name="AtCoder", value="atcoder"),
         app_commands.Choice(name="Paiza", value="paiza"),
     ])
+    @app_commands.guild_only()
     async def delete(self, interaction: discord.Interaction, platform: app_commands.Choice[str]):
         await interaction.response.defer(ephemeral=True)
+        guild_id = interaction.guild_id
         user_id = interaction.user.id
 
         conn = get_db_connection()
         problems = conn.execute(
-            "SELECT problem_id, solved_at FROM solved_problems WHERE user_id = ? AND platform = ? ORDER BY solved_at DESC LIMIT 25",
-            (user_id, platform.value)
+            "SELECT problem_id, solved_at FROM solved_problems WHERE guild_id = ? AND user_id = ? AND platform = ? ORDER BY solved_at DESC LIMIT 25",
+            (guild_id, user_id, platform.value)
         ).fetchall()
         conn.close()
 
@@ -85,7 +97,7 @@ class Delete(commands.Cog):
             await interaction.followup.send("ん？記録がないじゃないか。実験に記録はつきものだよ。", ephemeral=True)
             return
 
-        view = DeleteView(user_id, platform.value, problems)
+        view = DeleteView(guild_id, user_id, platform.value, problems)
         await interaction.followup.send(
             f"{interaction.user.display_name}くん、**{platform.name}**の削除したい問題を選択したまえ（直近25件まで表示）。",
             view=view,
@@ -5,6 +5,7 @@ import datetime
 import re
 import sqlite3
 from database import get_db_connection
+from streaks import record_solve
 
 class Log(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -32,8 +33,10 @@ class Log(commands.Cog):
         app_commands.Choice(name="AtCoder", value="atcoder"),
         app_commands.Choice(name="Paiza", value="paiza"),
     ])
+    @app_commands.guild_only()
     async def log_problem(self, interaction: discord.Interaction, platform: app_commands.Choice[str], identifier: str):
         await interaction.response.defer(ephemeral=True)
+        guild_id = interaction.guild_id
         user_id = interaction.user.id
         problem_id = self.parse_identifier(platform.value, identifier)
         if not problem_id:
@@ -49,11 +52,14 @@ class Log(commands.Cog):
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+            cursor.execute("INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
+            solved_at = datetime.datetime.now(datetime.timezone.utc)
             cursor.execute(
-                "INSERT INTO solved_problems (user_id, platform, problem_id, url, solved_at) VALUES (?, ?, ?, ?, ?)",
-                (user_id, platform.value, problem_id, url_to_save, datetime.datetime.now(datetime.timezone.utc))
+                "INSERT INTO solved_problems (guild_id, user_id, platform, problem_id, url, solved_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, user_id, platform.value, problem_id, url_to_save, solved_at)
             )
+            # 連続記録も同じトランザクションで更新する
+            record_solve(cursor, guild_id, user_id, solved_at)
             conn.commit()
             await interaction.followup.send(f"記録できたよ。\nプラットフォーム: {platform.name}\n問題ID: {problem_id}", ephemeral=True)
         except sqlite3.IntegrityError:
@@ -4,10 +4,17 @@ from discord.ext import commands, tasks
 import datetime
 from zoneinfo import ZoneInfo, available_timezones
 from database import get_db_connection
+from contest_schedule import Contest, ContestSchedule
+from streaks import DEFAULT_TZ, effective_current_streak, get_user_tz, recompute_streak
+
+# 1通のメッセージに含めるメンションの上限（2000文字制限対策）
+MENTIONS_PER_MESSAGE = 50
 
 class Reminder(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.contest_schedule = ContestSchedule()
+        self.last_contest_check = None # 前回コンテスト通知を確認した時刻
         self.daily_reminder_check.start() # Cogのロード時にタスクを開始
 
     def cog_unload(self):
@@ -21,9 +28,10 @@ class Reminder(commands.Cog):
         conn = get_db_connection()
         try:
             # リマインダーを設定している全ユーザーを取得
-            users_with_reminders = conn.execute("SELECT user_id, reminder_time, reminder_tz FROM users WHERE reminder_time IS NOT NULL AND reminder_tz IS NOT NULL").fetchall()
+            users_with_reminders = conn.execute("SELECT guild_id, user_id, reminder_time, reminder_tz FROM users WHERE reminder_time IS NOT NULL AND reminder_tz IS NOT NULL").fetchall()
 
             for user_row in users_with_reminders:
+                guild_id = user_row['guild_id']
                 user_id = user_row['user_id']
                 reminder_time_str = user_row['reminder_time'] # "HH:MM"形式
                 tz_str = user_row['reminder_tz']
@@ -37,39 +45,47 @@ class Reminder(commands.Cog):
 
                     # リマインダー時刻と現在時刻が一致するかチェック
                     if now_local.hour == reminder_hour and now_local.minute == reminder_minute:
-                        await self.check_and_send_reminder(user_id)
+                        await self.check_and_send_reminder(guild_id, user_id)
 
                 except Exception as e:
                     print(f"Error processing reminder for user {user_id}: {e}")
         finally:
             conn.close()
 
+        # コンテスト開始前通知も同じループで処理する
+        try:
+            await self.dispatch_contest_notifications(now_utc)
+        except Exception as e:
+            print(f"Error processing contest notifications: {e}")
+
     @daily_reminder_check.before_loop
     async def before_daily_reminder_check(self):
         await self.bot.wait_until_ready() # Botの準備が完了するまで待機
         print("Reminder loop is waiting for the bot to be ready...")
 
-    async def check_and_send_reminder(self, user_id: int):
+    async def check_and_send_reminder(self, guild_id: int, user_id: int):
         conn = get_db_connection()
         try:
-            # 過去24時間以内のAC記録が存在するかチェック
-            # SELECT EXISTSは存在チェックに最も効率的なクエリ [19, 30]
-            res = conn.execute(
-                """
-                SELECT EXISTS (
-                    SELECT 1 FROM solved_problems 
-                    WHERE user_id =? AND solved_at >=?
-                )
-                """,
-                (user_id, datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1))
+            # 連続記録の最終解答日（ユーザーのタイムゾーン基準）が今日かどうかで判定する
+            streak = conn.execute(
+                "SELECT current_streak, last_solve_day, reminder_tz FROM users WHERE guild_id =? AND user_id =?",
+                (guild_id, user_id)
             ).fetchone()
+            if streak is None:
+                return
 
-            has_solved_today = res == 1
+            today = datetime.datetime.now(get_user_tz(streak['reminder_tz'])).date()
+            has_solved_today = streak['last_solve_day'] == today.isoformat()
 
             if not has_solved_today:
+                message = "【リマインダー】\nこんにちは！今日はまだ問題を解いていないようです。少しでもコードに触れてみませんか？💪"
+                # 昨日まで続いている連続記録は、今日解かないと途切れる
+                current_streak = effective_current_streak(streak['current_streak'], streak['last_solve_day'], today)
+                if current_streak > 0:
+                    message += f"\n現在{current_streak}日連続で解いています。今日解かないと連続記録が途切れてしまいます！🔥"
                 try:
                     user = await self.bot.fetch_user(user_id)
-                    await user.send("【リマインダー】\nこんにちは！今日はまだ問題を解いていないようです。少しでもコードに触れてみませんか？💪")
+                    await user.send(message)
                     print(f"Sent reminder to user {user_id}")
                 except discord.Forbidden:
                     print(f"Could not send DM to user {user_id}. They may have DMs disabled.")
@@ -78,9 +94,57 @@ class Reminder(commands.Cog):
         finally:
             conn.close()
 
+    async def dispatch_contest_notifications(self, now_utc: datetime.datetime):
+        # 前回の確認から今回までの間に通知時刻を迎えたものを送る（ループの遅延で取りこぼさないため）
+        since = self.last_contest_check or now_utc - datetime.timedelta(minutes=1)
+        self.last_contest_check = now_utc
+
+        conn = get_db_connection()
+        try:
+            subscriptions = conn.execute("SELECT user_id, channel_id, minutes_before FROM contest_subscriptions").fetchall()
+        finally:
+            conn.close()
+
+        # 購読者がいなければ予定の取得自体を行わない
+        if not subscriptions:
+            return
+
+        # 予定の取得はループ1回につき1度だけ（購読者数に依存しない）
+        contests = await self.contest_schedule.get_contests()
+
+        # (チャンネル, コンテスト, 何分前) ごとにユーザーをまとめる
+        fan_out = {}
+        for contest in contests:
+            for sub in subscriptions:
+                notify_at = contest.start - datetime.timedelta(minutes=sub['minutes_before'])
+                if since < notify_at <= now_utc:
+                    key = (sub['channel_id'], contest, sub['minutes_before'])
+                    fan_out.setdefault(key, []).append(sub['user_id'])
+
+        for (channel_id, contest, minutes_before), user_ids in fan_out.items():
+            await self.send_contest_notification(channel_id, contest, minutes_before, user_ids)
+
+    async def send_contest_notification(self, channel_id: int, contest: Contest, minutes_before: int, user_ids: list[int]):
+        try:
+            channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+            timestamp = int(contest.start.timestamp())
+            header = f"【コンテスト通知】\n**{contest.title}** があと{minutes_before}分で始まります！\n開始: <t:{timestamp}:F> (<t:{timestamp}:R>)"
+            if contest.url:
+                header += f"\n{contest.url}"
+
+            for i in range(0, len(user_ids), MENTIONS_PER_MESSAGE):
+                mentions = " ".join(f"<@{user_id}>" for user_id in user_ids[i:i + MENTIONS_PER_MESSAGE])
+                await channel.send(f"{header}\n{mentions}")
+            print(f"Sent contest notification for {contest.contest_id} to channel {channel_id} ({len(user_ids)} users)")
+        except discord.Forbidden:
+            print(f"Could not send contest notification to channel {channel_id}. Missing permissions.")
+        except Exception as e:
+            print(f"Failed to send contest notification to channel {channel_id}: {e}")
+
     #... (Reminderクラス内)
     @app_commands.command(name="set_reminder", description="毎日のリマインダー時刻とタイムゾーンを設定します。")
     @app_commands.describe(time="リマインダー時刻 (HH:MM形式, 例: 21:00)", timezone="あなたのタイムゾーン (例: Asia/Tokyo)")
+    @app_commands.guild_only()
     async def set_reminder(self, interaction: discord.Interaction, time: str, timezone: str):
         # 時刻形式のバリデーション
         try:
@@ -94,12 +158,17 @@ class Reminder(commands.Cog):
             await interaction.response.send_message("無効なタイムゾーンです。有効なタイムゾーン名を入力してください。", ephemeral=True)
             return
 
+        guild_id = interaction.guild_id
         user_id = interaction.user.id
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
-            cursor.execute("UPDATE users SET reminder_time =?, reminder_tz =? WHERE user_id =?", (time, timezone, user_id))
+            cursor.execute("INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
+            old_tz = cursor.execute("SELECT reminder_tz FROM users WHERE guild_id =? AND user_id =?", (guild_id, user_id)).fetchone()['reminder_tz']
+            cursor.execute("UPDATE users SET reminder_time =?, reminder_tz =? WHERE guild_id =? AND user_id =?", (time, timezone, guild_id, user_id))
+            # 日付の区切りが変わるので、連続記録を作り直す
+            if (old_tz or DEFAULT_TZ) != timezone:
+                recompute_streak(cursor, guild_id, user_id)
             conn.commit()
             await interaction.response.send_message(f"リマインダーを毎日 {time} ({timezone}) に設定しました。", ephemeral=True)
         except Exception as e:
@@ -107,6 +176,44 @@ class Reminder(commands.Cog):
         finally:
             conn.close()
 
+    @app_commands.command(name="set_contest_notify", description="コンテスト開始前にこのチャンネルで通知します。")
+    @app_commands.describe(minutes="開始何分前に通知するか (1〜1440)")
+    @app_commands.guild_only()
+    async def set_contest_notify(self, interaction: discord.Interaction, minutes: app_commands.Range[int, 1, 1440] = 30):
+        guild_id = interaction.guild_id
+        user_id = interaction.user.id
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
+            cursor.execute(
+                "INSERT OR REPLACE INTO contest_subscriptions (guild_id, user_id, channel_id, minutes_before) VALUES (?, ?, ?, ?)",
+                (guild_id, user_id, interaction.channel_id, minutes)
+            )
+            conn.commit()
+            await interaction.response.send_message(f"コンテスト開始の{minutes}分前にこのチャンネルで通知します。", ephemeral=True)
+        except Exception as e:
+            await interaction.response.send_message(f"設定中にエラーが発生しました: {e}", ephemeral=True)
+        finally:
+            conn.close()
+
+    @app_commands.command(name="stop_contest_notify", description="コンテスト開始前の通知を停止します。")
+    @app_commands.guild_only()
+    async def stop_contest_notify(self, interaction: discord.Interaction):
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM contest_subscriptions WHERE guild_id =? AND user_id =?", (interaction.guild_id, interaction.user.id))
+            conn.commit()
+            if cursor.rowcount:
+                await interaction.response.send_message("コンテスト通知を停止しました。", ephemeral=True)
+            else:
+                await interaction.response.send_message("コンテスト通知は設定されていません。", ephemeral=True)
+        except Exception as e:
+            await interaction.response.send_message(f"設定中にエラーが発生しました: {e}", ephemeral=True)
+        finally:
+            conn.close()
+
     # タイムゾーン入力のオートコンプリート機能
     @set_reminder.autocomplete('timezone')
     async def timezone_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
@@ -3,28 +3,36 @@ from discord import app_commands
 from discord.ext import commands
 import datetime
 from database import get_db_connection
+from streaks import effective_current_streak, get_user_tz
 
 class Summary(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
     @app_commands.command(name="summary", description="あなたの解答記録のサマリーを表示します。")
+    @app_commands.guild_only()
     async def summary(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
+        guild_id = interaction.guild_id
         user_id = interaction.user.id
         
         conn = get_db_connection()
         try:
             recent_solves = conn.execute(
-                "SELECT platform, problem_id, url, solved_at FROM solved_problems WHERE user_id = ? ORDER BY solved_at DESC LIMIT 10",
-                (user_id,)
+                "SELECT platform, problem_id, url, solved_at FROM solved_problems WHERE guild_id = ? AND user_id = ? ORDER BY solved_at DESC LIMIT 10",
+                (guild_id, user_id)
             ).fetchall()
 
             solve_counts = conn.execute(
-                "SELECT platform, COUNT(*) as count FROM solved_problems WHERE user_id = ? GROUP BY platform",
-                (user_id,)
+                "SELECT platform, COUNT(*) as count FROM solved_problems WHERE guild_id = ? AND user_id = ? GROUP BY platform",
+                (guild_id, user_id)
             ).fetchall()
 
+            streak = conn.execute(
+                "SELECT current_streak, longest_streak, last_solve_day, reminder_tz FROM users WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id)
+            ).fetchone()
+
             if not recent_solves:
                 await interaction.followup.send("ん？記録がないじゃないか。実験に記録はつきものだよ。", ephemeral=True)
                 return
@@ -38,6 +46,15 @@ class Summary(commands.Cog):
             if count_text:
                 embed.add_field(name="プラットフォーム別解答数", value=count_text, inline=False)
 
+            if streak:
+                today = datetime.datetime.now(get_user_tz(streak['reminder_tz'])).date()
+                current_streak = effective_current_streak(streak['current_streak'], streak['last_solve_day'], today)
+                embed.add_field(
+                    name="連続記録",
+                    value=f"現在: {current_streak}日\n最長: {streak['longest_streak']}日",
+                    inline=False
+                )
+
             solve_list = []
             for solve in recent_solves:
                 solved_at_dt = datetime.datetime.fromisoformat(solve['solved_at']) 
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import asyncio
+import datetime
+from dataclasses import dataclass
+import aiohttp
+
+# コンテスト予定の取得元。"プラットフォーム=URL" をカンマ区切りで複数指定できる
+# （例: "atcoder=https://...,paiza=https://..."。テスト時はローカルのスタブサーバーを指定する）
+# Paizaは公開されている予定フィードがないため、既定ではAtCoderのみ
+CONTEST_SCHEDULE_SOURCES = os.getenv('CONTEST_SCHEDULE_SOURCES', 'atcoder=https://kenkoooo.com/atcoder/resources/contests.json')
+CONTEST_CACHE_FILE = os.getenv('CONTEST_CACHE_FILE', 'contest_schedule_cache.json')
+# キャッシュの有効期間（秒）。この間はHTTPリクエストを送らない
+CONTEST_CACHE_TTL = int(os.getenv('CONTEST_CACHE_TTL', '3600'))
+# 取得に失敗したときの再試行間隔（秒）
+CONTEST_RETRY_INTERVAL = int(os.getenv('CONTEST_RETRY_INTERVAL', '60'))
+
+@dataclass(frozen=True)
+class Contest:
+    platform: str
+    contest_id: str
+    title: str
+    start: datetime.datetime
+    duration: int
+    url: str | None
+
+def parse_sources(sources: str) -> dict[str, str]:
+    """"atcoder=URL,paiza=URL" 形式の設定を {プラットフォーム: URL} に変換する"""
+    result = {}
+    for entry in sources.split(','):
+        if not entry.strip():
+            continue
+        platform, _, url = entry.partition('=')
+        if not url:
+            raise ValueError(f"Invalid contest schedule source: {entry!r} (expected platform=URL)")
+        result[platform.strip()] = url.strip()
+    return result
+
+def parse_contest(item: dict, platform: str = 'atcoder') -> Contest:
+    """取得元のJSON要素をContestに変換する（AtCoder Problemsのcontests.json形式）"""
+    platform = item.get('platform', platform)
+    contest_id = item['id']
+    url = item.get('url')
+    if url is None and platform == 'atcoder':
+        url = f"https://atcoder.jp/contests/{contest_id}"
+    return Contest(
+        platform=platform,
+        contest_id=contest_id,
+        title=item.get('title', contest_id),
+        start=datetime.datetime.fromtimestamp(item['start_epoch_second'], datetime.timezone.utc),
+        duration=item.get('duration_second', 0),
+        url=url,
+    )
+
+def parse_contests(items: list, platform: str) -> list[tuple[dict, Contest]]:
+    """要素ごとに変換し、壊れた要素だけを読み飛ばす"""
+    parsed = []
+    for item in items:
+        try:
+            parsed.append((item, parse_contest(item, platform)))
+        except (KeyError, TypeError, ValueError, OverflowError, AttributeError) as e:
+            print(f"Skipping invalid {platform} contest entry {item!r}: {e!r}")
+    return parsed
+
+class ContestSchedule:
+    """コンテスト予定を取得元ごとにディスクへキャッシュし、TTL切れのときだけ条件付きリクエストで再検証する"""
+    def __init__(self, sources: dict[str, str] | None = None, cache_file: str = CONTEST_CACHE_FILE,
+                 ttl: int = CONTEST_CACHE_TTL, retry_interval: int = CONTEST_RETRY_INTERVAL):
+        self.sources = sources if sources is not None else parse_sources(CONTEST_SCHEDULE_SOURCES)
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.cache = self.load_cache()
+        # 取得に失敗した取得元の次回再試行時刻（メモリ上のみ）
+        self.retry_at = {}
+        self.contests = self.collect_contests()
+        # 同時に呼ばれても取得は1回だけにする
+        self.lock = asyncio.Lock()
+
+    def load_cache(self) -> dict:
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                cache = json.load(f)
+            if isinstance(cache.get('sources'), dict):
+                return cache
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring broken contest cache {self.cache_file}: {e}")
+        return {'sources': {}}
+
+    def save_cache(self):
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+
+    def source_cache(self, platform: str) -> dict:
+        entry = self.cache['sources'].get(platform)
+        # 取得元のURLが変わったら古いキャッシュは使わない
+        if entry is None or entry.get('url') != self.sources[platform]:
+            entry = {'url': self.sources[platform], 'fetched_at': 0, 'etag': None, 'last_modified': None, 'contests': []}
+            self.cache['sources'][platform] = entry
+        return entry
+
+    def collect_contests(self) -> list[Contest]:
+        contests = []
+        for platform in self.sources:
+            contests.extend(contest for _, contest in parse_contests(self.source_cache(platform)['contests'], platform))
+        return sorted(contests, key=lambda contest: contest.start)
+
+    def is_due(self, platform: str) -> bool:
+        now = time.time()
+        if platform in self.retry_at:
+            return now >= self.retry_at[platform]
+        return now - self.source_cache(platform)['fetched_at'] >= self.ttl
+
+    async def get_contests(self) -> list[Contest]:
+        """キャッシュ済みのコンテスト予定を返す。TTL切れの取得元があれば先に再取得する"""
+        async with self.lock:
+            due = [platform for platform in self.sources if self.is_due(platform)]
+            if due:
+                timeout = aiohttp.ClientTimeout(total=30)
+                async with aiohttp.ClientSession(timeout=timeout) as session:
+                    for platform in due:
+                        await self.refresh(session, platform)
+                self.contests = self.collect_contests()
+        return self.contests
+
+    async def refresh(self, session: aiohttp.ClientSession, platform: str):
+        entry = self.source_cache(platform)
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            async with session.get(entry['url'], headers=headers) as response:
+                if response.status == 304:
+                    # 変更なし。有効期限だけ延長する
+                    entry['fetched_at'] = time.time()
+                else:
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+                    if not isinstance(data, list):
+                        raise ValueError(f"expected a JSON list, got {type(data).__name__}")
+
+                    # 開始済みのコンテストは通知に不要なのでキャッシュしない
+                    now = time.time()
+                    upcoming = [item for item, contest in parse_contests(data, platform) if contest.start.timestamp() > now]
+                    entry.update({
+                        'fetched_at': now,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'contests': upcoming,
+                    })
+            self.retry_at.pop(platform, None)
+            self.save_cache()
+        except Exception as e:
+            # 古いキャッシュで続行し、TTLより短い間隔で再試行する
+            print(f"Failed to refresh {platform} contest schedule: {e}")
+            self.retry_at[platform] = time.time() + self.retry_interval
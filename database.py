@@ -1,26 +1,34 @@
+import os
 import sqlite3
 import datetime
+from streaks import recompute_streak
 
 DATABASE_FILE = "solved_problems.db"
+# スキーマのバージョン（PRAGMA user_versionに保存する）
+SCHEMA_VERSION = 2
+# ギルド対応前のデータを割り当てるサーバーID
+LEGACY_GUILD_ID = int(os.getenv('LEGACY_GUILD_ID', '1392293394071425054'))
 
-def get_db_connection():
+def get_db_connection(database_file: str | None = None):
     """データベース接続を取得し、Rowファクトリを設定する"""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = sqlite3.connect(database_file or DATABASE_FILE)
     conn.row_factory = sqlite3.Row
     return conn
 
-def initialize_database():
-    """データベースを初期化し、必要なテーブルを作成する"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # ユーザー設定テーブル
+def create_tables(cursor: sqlite3.Cursor):
+    """最新スキーマのテーブルとインデックスを作成する"""
+    # ユーザー設定テーブル（サーバーごとに分ける）
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS users (
-        user_id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
         atcoder_id TEXT,
         reminder_time TEXT,
-        reminder_tz TEXT
+        reminder_tz TEXT,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        longest_streak INTEGER NOT NULL DEFAULT 0,
+        last_solve_day TEXT,
+        PRIMARY KEY (guild_id, user_id)
     )
     """)
 
@@ -28,24 +36,102 @@ def initialize_database():
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS solved_problems (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
         user_id INTEGER NOT NULL,
         platform TEXT NOT NULL,
         problem_id TEXT NOT NULL,
         url TEXT,
         solved_at TIMESTAMP NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users (user_id)
+        FOREIGN KEY (guild_id, user_id) REFERENCES users (guild_id, user_id)
     )
     """)
-    
-    # user_idとproblem_idの組み合わせが一意であることを保証する
+
+    # サーバー内でuser_idとproblem_idの組み合わせが一意であることを保証する
+    # guild_idを先頭に置き、サーバー単位の集計（ランキングなど）を範囲スキャンにする
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_guild_user_problem ON solved_problems (guild_id, user_id, problem_id)
+    """)
+
+    # サマリーの「最新10件」をソートなしで取得するためのインデックス
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_guild_user_solved_at ON solved_problems (guild_id, user_id, solved_at)
+    """)
+
+    # コンテスト開始前通知の購読テーブル（通知先チャンネルごとにまとめて送る）
     cursor.execute("""
-    CREATE UNIQUE INDEX IF NOT EXISTS idx_user_problem ON solved_problems (user_id, problem_id)
+    CREATE TABLE IF NOT EXISTS contest_subscriptions (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        minutes_before INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id),
+        FOREIGN KEY (guild_id, user_id) REFERENCES users (guild_id, user_id)
+    )
     """)
 
-    conn.commit()
-    conn.close()
+def table_exists(cursor: sqlite3.Cursor, table: str) -> bool:
+    row = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+def migrate_to_guilds(cursor: sqlite3.Cursor):
+    """ギルド列のない旧スキーマのデータをLEGACY_GUILD_IDのサーバーに移行する"""
+    old_tables = [table for table in ("users", "solved_problems", "contest_subscriptions") if table_exists(cursor, table)]
+    for table in old_tables:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    # 旧テーブルのインデックスはテーブルと一緒に移動するので、新しいインデックスと衝突しない
+    create_tables(cursor)
+
+    if "users" in old_tables:
+        cursor.execute(
+            "INSERT INTO users (guild_id, user_id, atcoder_id, reminder_time, reminder_tz) SELECT ?, user_id, atcoder_id, reminder_time, reminder_tz FROM users_old",
+            (LEGACY_GUILD_ID,)
+        )
+    if "solved_problems" in old_tables:
+        cursor.execute(
+            "INSERT INTO solved_problems (id, guild_id, user_id, platform, problem_id, url, solved_at) SELECT id, ?, user_id, platform, problem_id, url, solved_at FROM solved_problems_old",
+            (LEGACY_GUILD_ID,)
+        )
+    if "contest_subscriptions" in old_tables:
+        cursor.execute(
+            "INSERT INTO contest_subscriptions (guild_id, user_id, channel_id, minutes_before) SELECT ?, user_id, channel_id, minutes_before FROM contest_subscriptions_old",
+            (LEGACY_GUILD_ID,)
+        )
+
+    for table in old_tables:
+        cursor.execute(f"DROP TABLE {table}_old")
+    print(f"Migrated existing data to guild {LEGACY_GUILD_ID}.")
+
+def migrate_add_streaks(cursor: sqlite3.Cursor):
+    """usersに連続記録の列を追加する（値はinitialize_databaseで全履歴から計算する）"""
+    cursor.execute("ALTER TABLE users ADD COLUMN current_streak INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE users ADD COLUMN longest_streak INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE users ADD COLUMN last_solve_day TEXT")
+
+def initialize_database(database_file: str | None = None):
+    """データベースを初期化し、必要なテーブルを作成する（旧スキーマは移行する）"""
+    conn = get_db_connection(database_file)
+    cursor = conn.cursor()
+    # 移行途中で失敗しても元に戻せるよう、全体を1つのトランザクションで行う
+    cursor.execute("BEGIN")
+    try:
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1 and table_exists(cursor, "users"):
+            migrate_to_guilds(cursor)
+        elif version < 2 and table_exists(cursor, "users"):
+            migrate_add_streaks(cursor)
+        create_tables(cursor)
+        if version < 2:
+            for row in cursor.execute("SELECT guild_id, user_id FROM users").fetchall():
+                recompute_streak(cursor, row['guild_id'], row['user_id'])
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
     print("Database initialized successfully.")
 
 # main.pyで呼び出すために、このスクリプトが直接実行されたときにも初期化する
 if __name__ == '__main__':
-    initialize_database()
\ No newline at end of file
+    initialize_database()
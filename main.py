@@ -6,11 +6,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
+from database import initialize_database
 
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
-# あなたのサーバーID
-GUILD_ID = 1392293394071425054
+# コマンドを即時反映するサーバーID（カンマ区切り）。未設定ならグローバルに同期する
+GUILD_IDS = [int(guild_id) for guild_id in os.getenv('GUILD_IDS', '').split(',') if guild_id.strip()]
 
 class MyBot(commands.Bot):
     def __init__(self):
@@ -20,6 +21,9 @@ class MyBot(commands.Bot):
         )
 
     async def setup_hook(self):
+        # 新しいテーブルを作成してからcogsをロードする
+        initialize_database()
+
         # cogsのロード処理
         print("-" * 30)
         excluded_files = ["__init__.py", "problem_tracker.py"]
@@ -54,17 +58,53 @@ async def main():
 
     @bot.command()
     @commands.is_owner()
-    async def sync(ctx: commands.Context):
-        """オーナー用の手動コマンド同期"""
-        guild = discord.Object(id=GUILD_ID)
+    async def sync(ctx: commands.Context, scope: str | None = None):
+        """オーナー用の手動コマンド同期
+
+        !sync        GUILD_IDSの各サーバーに同期（未設定ならグローバル）
+        !sync global グローバルに同期（全サーバーへの反映には最大1時間かかる）
+        !sync here   実行したサーバーだけに同期
+
+        グローバルとサーバー単位の両方に同期すると、そのサーバーではコマンドが二重に表示される。
+        そのため !sync global はGUILD_IDSのサーバーに残ったコピーを削除する。
+        グローバル同期後にサーバー単位で同期した場合は、再度 !sync global を実行するまで二重表示になる。
+        """
+        if scope not in (None, "global", "here"):
+            await ctx.send(f"Unknown sync scope: {scope} (use global or here)")
+            return
+        if scope == "here" and ctx.guild is None:
+            await ctx.send("`!sync here` must be run in a server.")
+            return
+
+        if scope == "here":
+            guilds = [ctx.guild]
+        elif scope == "global" or not GUILD_IDS:
+            guilds = [None]
+        else:
+            guilds = [discord.Object(id=guild_id) for guild_id in GUILD_IDS]
+
         try:
             # コマンドを同期
-            synced = await bot.tree.sync(guild=guild)
-            
-            await ctx.send(f"Synced {len(synced)} commands to the guild.")
-            print(f"Synced {len(synced)} commands to the guild.")
-            for cmd in synced:
-                print(f"- {cmd.name}")
+            for guild in guilds:
+                if guild is None:
+                    synced = await bot.tree.sync()
+                    target = "global"
+                    # サーバー単位のコピーを消して二重表示を防ぐ
+                    for guild_id in GUILD_IDS:
+                        copied_guild = discord.Object(id=guild_id)
+                        bot.tree.clear_commands(guild=copied_guild)
+                        await bot.tree.sync(guild=copied_guild)
+                        print(f"Cleared guild commands in {guild_id}.")
+                else:
+                    # Cogのコマンドはグローバル登録なので、サーバーにコピーしてから同期する
+                    bot.tree.copy_global_to(guild=guild)
+                    synced = await bot.tree.sync(guild=guild)
+                    target = f"guild {guild.id}"
+
+                await ctx.send(f"Synced {len(synced)} commands to {target}.")
+                print(f"Synced {len(synced)} commands to {target}.")
+                for cmd in synced:
+                    print(f"- {cmd.name}")
         except Exception as e:
             await ctx.send(f"Failed to sync commands: {e}")
             print(f"Failed to sync commands: {e}")
@@ -0,0 +1,105 @@
+import sqlite3
+import datetime
+from zoneinfo import ZoneInfo
+
+# reminder_tz未設定のユーザーは日本時間で日付を区切る
+DEFAULT_TZ = "Asia/Tokyo"
+
+def get_user_tz(tz_str: str | None) -> ZoneInfo:
+    return ZoneInfo(tz_str or DEFAULT_TZ)
+
+def local_day(solved_at: datetime.datetime | str, tz: ZoneInfo) -> datetime.date:
+    """解答日時をユーザーのタイムゾーンでの日付に変換する"""
+    if isinstance(solved_at, str):
+        solved_at = datetime.datetime.fromisoformat(solved_at)
+    return solved_at.astimezone(tz).date()
+
+def effective_current_streak(current_streak: int, last_solve_day: str | None, today: datetime.date) -> int:
+    """保存されている連続日数は最終解答日時点のもの。昨日も今日も解いていなければ途切れている"""
+    if last_solve_day is None:
+        return 0
+    if datetime.date.fromisoformat(last_solve_day) < today - datetime.timedelta(days=1):
+        return 0
+    return current_streak
+
+def compute_streak(days: list[datetime.date]) -> tuple[int, int, datetime.date | None]:
+    """昇順に並んだ（重複のない）解答日から (現在の連続日数, 最長連続日数, 最終解答日) を求める"""
+    current = longest = 0
+    previous = None
+    for day in days:
+        if previous is not None and day == previous + datetime.timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+def compute_streak_state(cursor: sqlite3.Cursor, guild_id: int, user_id: int, tz_str: str | None) -> tuple[int, int, str | None]:
+    """全解答履歴から連続記録を計算し直す（O(履歴数)）"""
+    tz = get_user_tz(tz_str)
+    rows = cursor.execute(
+        "SELECT solved_at FROM solved_problems WHERE guild_id = ? AND user_id = ?",
+        (guild_id, user_id)
+    ).fetchall()
+    days = sorted({local_day(row[0], tz) for row in rows})
+    current, longest, last_day = compute_streak(days)
+    return current, longest, last_day.isoformat() if last_day else None
+
+def recompute_streak(cursor: sqlite3.Cursor, guild_id: int, user_id: int):
+    """保存されている連続記録を全履歴から作り直す（削除時・タイムゾーン変更時用）"""
+    row = cursor.execute("SELECT reminder_tz FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone()
+    if row is None:
+        return
+    current, longest, last_day = compute_streak_state(cursor, guild_id, user_id, row[0])
+    cursor.execute(
+        "UPDATE users SET current_streak = ?, longest_streak = ?, last_solve_day = ? WHERE guild_id = ? AND user_id = ?",
+        (current, longest, last_day, guild_id, user_id)
+    )
+
+def record_solve(cursor: sqlite3.Cursor, guild_id: int, user_id: int, solved_at: datetime.datetime):
+    """解答の記録に合わせて連続記録をO(1)で更新する（/logの書き込みと同じトランザクションで呼ぶ）"""
+    row = cursor.execute(
+        "SELECT reminder_tz, current_streak, longest_streak, last_solve_day FROM users WHERE guild_id = ? AND user_id = ?",
+        (guild_id, user_id)
+    ).fetchone()
+    if row is None:
+        return
+    reminder_tz, current, longest, last_solve_day = row
+    day = local_day(solved_at, get_user_tz(reminder_tz))
+
+    if last_solve_day is None:
+        current = 1
+    else:
+        last_day = datetime.date.fromisoformat(last_solve_day)
+        if day == last_day:
+            return
+        if day < last_day:
+            # 最終解答日より前の記録は途中の連続を変えうるので作り直す
+            recompute_streak(cursor, guild_id, user_id)
+            return
+        current = current + 1 if day == last_day + datetime.timedelta(days=1) else 1
+
+    cursor.execute(
+        "UPDATE users SET current_streak = ?, longest_streak = ?, last_solve_day = ? WHERE guild_id = ? AND user_id = ?",
+        (current, max(longest, current), day.isoformat(), guild_id, user_id)
+    )
+
+def has_solve_on_day(cursor: sqlite3.Cursor, guild_id: int, user_id: int, day: datetime.date, tz: ZoneInfo) -> bool:
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=tz).astimezone(datetime.timezone.utc)
+    end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz).astimezone(datetime.timezone.utc)
+    row = cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM solved_problems WHERE guild_id = ? AND user_id = ? AND solved_at >= ? AND solved_at < ?)",
+        (guild_id, user_id, start, end)
+    ).fetchone()
+    return row[0] == 1
+
+def update_streak_after_delete(cursor: sqlite3.Cursor, guild_id: int, user_id: int, deleted_solved_ats: list[str]):
+    """削除によって解答日そのものが消えたときだけ連続記録を作り直す"""
+    row = cursor.execute("SELECT reminder_tz FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone()
+    if row is None:
+        return
+    tz = get_user_tz(row[0])
+    deleted_days = {local_day(solved_at, tz) for solved_at in deleted_solved_ats}
+    if any(not has_solve_on_day(cursor, guild_id, user_id, day, tz) for day in deleted_days):
+        recompute_streak(cursor, guild_id, user_id)
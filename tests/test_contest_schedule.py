@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+from aiohttp import web
+
+import database
+from contest_schedule import ContestSchedule
+
+
+class StandInServer:
+    """コンテスト予定の取得元の代わりになるローカルHTTPサーバー"""
+    def __init__(self, contests: list, etag: str = '"v1"', last_modified: str = 'Sun, 18 Oct 2026 00:00:00 GMT'):
+        self.contests = contests
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.headers))
+        # 応答を遅らせ、同時リクエストが重なる状況を作る
+        await asyncio.sleep(0.05)
+        if request.headers.get('If-None-Match') == self.etag:
+            return web.Response(status=304)
+        return web.json_response(self.contests, headers={'ETag': self.etag, 'Last-Modified': self.last_modified})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/contests.json', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/contests.json"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def contest_item(contest_id: str, starts_in: int) -> dict:
+    return {
+        'id': contest_id,
+        'title': contest_id.upper(),
+        'start_epoch_second': int(time.time()) + starts_in,
+        'duration_second': 6000,
+    }
+
+
+class ContestScheduleTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp_dir.name, 'cache.json')
+        self.server = StandInServer([contest_item('abc999', 600), contest_item('abc998', 1200)])
+        self.url = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.tmp_dir.cleanup()
+
+    async def test_concurrent_calls_send_one_request(self):
+        schedule = ContestSchedule({'atcoder': self.url}, self.cache_file, ttl=3600)
+        results = await asyncio.gather(*[schedule.get_contests() for _ in range(20)])
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual([c.contest_id for c in results[0]], ['abc999', 'abc998'])
+        self.assertTrue(all(result == results[0] for result in results))
+
+    async def test_revalidates_after_ttl_and_keeps_cache_on_304(self):
+        schedule = ContestSchedule({'atcoder': self.url}, self.cache_file, ttl=3600)
+        contests = await schedule.get_contests()
+
+        # キャッシュはディスクから読み直され、TTL内ならリクエストしない
+        reloaded = ContestSchedule({'atcoder': self.url}, self.cache_file, ttl=3600)
+        self.assertEqual(await reloaded.get_contests(), contests)
+        self.assertEqual(len(self.server.requests), 1)
+
+        # TTL切れ後は条件付きリクエストになり、304ならキャッシュをそのまま使う
+        with mock.patch('time.time', return_value=time.time() + 3601):
+            self.assertEqual(await reloaded.get_contests(), contests)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1].get('If-None-Match'), self.server.etag)
+        self.assertEqual(self.server.requests[1].get('If-Modified-Since'), self.server.last_modified)
+
+    async def test_skips_invalid_items_and_retries_failures_quickly(self):
+        self.server.contests.append({'title': 'no id', 'start_epoch_second': int(time.time()) + 600})
+        schedule = ContestSchedule({'atcoder': self.url, 'paiza': self.url.replace('contests.json', 'missing')},
+                                   self.cache_file, ttl=3600, retry_interval=60)
+        contests = await schedule.get_contests()
+
+        self.assertEqual([c.contest_id for c in contests], ['abc999', 'abc998'])
+        # 失敗した取得元だけがTTLより短い間隔で再試行される
+        self.assertFalse(schedule.is_due('atcoder'))
+        self.assertFalse(schedule.is_due('paiza'))
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertFalse(schedule.is_due('atcoder'))
+            self.assertTrue(schedule.is_due('paiza'))
+
+
+class FakeChannel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content: str):
+        self.messages.append(content)
+
+
+class FakeBot:
+    def __init__(self, channels: dict):
+        self.channels = channels
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def wait_until_ready(self):
+        # ループを動かさないため、準備完了にはしない
+        await asyncio.Event().wait()
+
+
+class ContestNotificationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database_file = os.path.join(self.tmp_dir.name, 'test.db')
+        patcher = mock.patch.object(database, 'DATABASE_FILE', self.database_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        database.initialize_database()
+
+        self.server = StandInServer([contest_item('abc999', 30 * 60 + 30)])
+        url = await self.server.start()
+
+        from cogs.reminder import Reminder
+        self.channels = {100: FakeChannel(), 200: FakeChannel()}
+        with mock.patch('cogs.reminder.ContestSchedule',
+                        lambda: ContestSchedule({'atcoder': url}, os.path.join(self.tmp_dir.name, 'cache.json'))):
+            self.reminder = Reminder(FakeBot(self.channels))
+
+    async def asyncTearDown(self):
+        self.reminder.cog_unload()
+        await self.server.stop()
+        self.tmp_dir.cleanup()
+
+    async def test_groups_subscribers_per_channel(self):
+        conn = database.get_db_connection()
+        subscriptions = [(1, 1, 100), (1, 2, 100), (1, 3, 100), (2, 4, 200), (2, 5, 200)]
+        conn.executemany("INSERT INTO users (guild_id, user_id) VALUES (?, ?)", [(g, u) for g, u, _ in subscriptions])
+        conn.executemany(
+            "INSERT INTO contest_subscriptions (guild_id, user_id, channel_id, minutes_before) VALUES (?, ?, ?, 30)",
+            subscriptions
+        )
+        conn.commit()
+        conn.close()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        await self.reminder.dispatch_contest_notifications(now)
+        self.assertEqual(self.channels[100].messages, [])
+
+        # 通知時刻（開始30分前）をまたいだ確認で、チャンネルごとに1通だけ送る
+        await self.reminder.dispatch_contest_notifications(now + datetime.timedelta(minutes=1))
+        self.assertEqual(len(self.channels[100].messages), 1)
+        self.assertEqual(len(self.channels[200].messages), 1)
+        for user_id in (1, 2, 3):
+            self.assertIn(f"<@{user_id}>", self.channels[100].messages[0])
+        for user_id in (4, 5):
+            self.assertIn(f"<@{user_id}>", self.channels[200].messages[0])
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()